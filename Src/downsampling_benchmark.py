@@ -0,0 +1,121 @@
+# Speed and accuracy of negative downsampling against the full data (chi-square, target encoding, CV).
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import model_training as mt
+import sampling as sp
+import statistical_testing as st
+import target_ecoding as te
+
+
+def synthetic_transactions(n_rows, seed, fraud_rate=0.0058):
+    """
+    Synthetic stand-in for df_train_processed.pkl (same size and fraud rate as fraudTrain.csv),
+    used when the real data is not available.
+    """
+    rng = np.random.default_rng(seed)
+    categories = np.array(['entertainment', 'food_dining', 'gas_transport', 'grocery_net', 'grocery_pos',
+                           'health_fitness', 'home', 'kids_pets', 'misc_net', 'misc_pos', 'personal_care',
+                           'shopping_net', 'shopping_pos', 'travel'])
+    networks = np.array(['Visa', 'Mastercard', 'American Express', 'Discover', 'Diners Club', 'JCB', 'Maestro'])
+    data = pd.DataFrame({
+        'trans_date_trans_time': pd.Timestamp('2019-01-01') + pd.to_timedelta(np.sort(rng.uniform(0, 538 * 86400, n_rows)), unit='s'),
+        'category': rng.choice(categories, n_rows),
+        'cc_network': rng.choice(networks, n_rows, p=[.35, .2, .1, .1, .05, .15, .05]),
+        'merchant': rng.integers(0, 693, n_rows).astype(str),
+        'gender': rng.choice(['F', 'M'], n_rows, p=[.55, .45]),
+        'age': rng.integers(14, 97, n_rows),
+        'amt_log': rng.normal(4.0, 1.0, n_rows),
+    })
+    data['trans_hour'] = data['trans_date_trans_time'].dt.hour
+
+    # fraud risk rises with the amount, at night and in a few categories / merchants
+    logit = (1.2 * (data['amt_log'] - 4.0) + 2.0 * data['trans_hour'].isin([22, 23, 0, 1, 2, 3])
+             + 1.0 * data['category'].isin(['grocery_pos', 'shopping_net', 'misc_net'])
+             + 0.3 * data['cc_network'].isin(['JCB', 'Maestro'])
+             + rng.normal(0, 0.5, 693)[data['merchant'].astype(int)])
+    offset = np.log(fraud_rate / (1 - fraud_rate)) - 2.1
+    data['is_fraud'] = (rng.random(n_rows) < 1 / (1 + np.exp(-(logit + offset)))).astype(int)
+    return data
+
+
+def run(data, test_df, chi_cols, te_cols, cv_features, seed, weight_col=None, cv_rounds=200):
+    """
+    Runs the chi-square tests, target encoding and LightGBM CV on `data`, timing each step.
+    """
+    timings, outputs = {}, {}
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        outputs['chi'] = {col: st.chi_square_test(data, col, 'is_fraud', print_results=False, weight_col=weight_col)
+                          for col in chi_cols}
+    timings['chi_square_test'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    train_encoded, test_encoded = te.leakage_free_target_encoding(
+        data, test_df, 'is_fraud', te_cols, seed, smoothing=100, n_splits=5, weight_col=weight_col)
+    timings['target_encoding'] = time.perf_counter() - start
+    outputs['te'] = test_encoded[[f'{col}_te' for col in te_cols]]
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        datasets = mt.build_datasets(train_encoded, feature_cols=cv_features, cache_dir=cache_dir, weight_col=weight_col)
+        folds = mt.make_folds(train_encoded, method='stratified', n_splits=3, seed=seed)
+        outputs['cv'] = mt.cross_validate(datasets, folds, model='lightgbm', num_boost_round=cv_rounds,
+                                          early_stopping_rounds=20, min_precision=0.5, seed=seed, n_jobs=1)
+    timings['cv_lightgbm'] = time.perf_counter() - start
+    return timings, outputs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare downsampled against full-data results.')
+    parser.add_argument('--train', default='../Data/df_train_processed.pkl', help='processed training pickle')
+    parser.add_argument('--rows', type=int, default=1296675, help='synthetic rows if --train does not exist')
+    parser.add_argument('--fracs', type=float, nargs='+', default=[0.1, 0.05, 0.02])
+    parser.add_argument('--seed', type=int, default=1776)
+    args = parser.parse_args()
+
+    if os.path.exists(args.train):
+        data = pd.read_pickle(args.train)
+        source = args.train
+    else:
+        data = synthetic_transactions(args.rows, args.seed)
+        source = f'synthetic ({args.rows:,} rows)'
+    data = data.reset_index(drop=True)
+    # time-ordered hold-out (last 20%) for the target encodings
+    split = int(len(data) * 0.8)
+    train_df, test_df = data.iloc[:split].reset_index(drop=True), data.iloc[split:].reset_index(drop=True)
+
+    chi_cols = ['category', 'trans_hour', 'cc_network', 'gender']
+    te_cols = ['category', 'cc_network', 'merchant']
+    cv_features = ['amt_log', 'age', 'trans_hour'] + [f'{col}_te' for col in te_cols]
+
+    full_timings, full = run(train_df, test_df, chi_cols, te_cols, cv_features, args.seed)
+
+    rows = [{'frac': 1.0, 'rows': len(train_df), **full_timings, 'speedup': 1.0,
+             'max_rate_err': 0.0, 'max_chi_pct_err': 0.0, 'te_mae': 0.0,
+             'pr_auc': full['cv']['pr_auc'].mean(), 'recall@0.50': full['cv']['recall@0.50'].mean()}]
+    for frac in args.fracs:
+        sample = sp.negative_downsample(train_df, 'is_fraud', frac, args.seed, strata_cols=['category'])
+        timings, result = run(sample, test_df, chi_cols, te_cols, cv_features, args.seed, weight_col='sample_weight')
+        rows.append({
+            'frac': frac,
+            'rows': len(sample),
+            **timings,
+            'speedup': sum(full_timings.values()) / sum(timings.values()),
+            'max_rate_err': max(sp.compare_rates(train_df, sample, col, 'is_fraud')['abs_diff'].max() for col in chi_cols),
+            'max_chi_pct_err': max((full['chi'][col] - result['chi'][col]).abs().max().max() for col in chi_cols),
+            'te_mae': (full['te'] - result['te']).abs().mean().mean(),
+            'pr_auc': result['cv']['pr_auc'].mean(),
+            'recall@0.50': result['cv']['recall@0.50'].mean(),
+        })
+
+    print(f"Data: {source}, fraud rate {train_df['is_fraud'].mean():.4%}\n")
+    print(pd.DataFrame(rows).to_string(index=False, float_format='%.4g'))
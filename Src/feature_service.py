@@ -0,0 +1,456 @@
+# In-process feature service for scoring single transactions without building DataFrames.
+import json
+import math
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+from category_encoders import TargetEncoder
+
+import utilities as u
+
+
+# Major Industry Identifier mapping (same mapping used in Fraud.ipynb)
+MII_TO_INDUSTRY = {
+    '1': 'Airlines',
+    '2': 'Airlines & Financial',
+    '3': 'Travel & Entertainment (e.g., American Express, Diners Club)',
+    '4': 'Banking & Financial (e.g., Visa)',
+    '5': 'Banking & Financial (e.g., Mastercard)',
+    '6': 'Merchandising & Banking (e.g., Discover)',
+    '7': 'Petroleum',
+    '8': 'Healthcare & Telecommunications',
+    '9': 'National Assignment / Other'
+}
+
+# Columns target encoded in Fraud.ipynb
+TE_COLS = ['cc_num', 'industry', 'cc_network', 'age_group', 'job', 'state', 'city', 'merchant', 'category', 'zip']
+
+# Numeric features returned by FeatureService.vector(), in order
+NUMERIC_FEATURES = [
+    'amt', 'amt_log', 'city_pop_log', 'age', 'store_distance',
+    'trans_qtr', 'trans_month', 'trans_day', 'trans_day_of_week', 'trans_hour', 'trans_week_of_year', 'is_weekend',
+    'trans_hour_sin', 'trans_hour_cos', 'trans_month_sin', 'trans_month_cos',
+    'trans_day_of_week_sin', 'trans_day_of_week_cos',
+]
+
+# Length of the BIN (Bank Identification Number) prefix used as lookup key
+BIN_LENGTH = 6
+
+
+def _clean_card_number(card_number):
+    """
+    Returns the card number as a digit string (spaces and hyphens removed).
+    """
+    return str(card_number).replace(' ', '').replace('-', '')
+
+
+def _bin_network(bin_prefix):
+    """
+    Determines the credit card network of a BIN prefix using the regex rules in utilities.
+    The network patterns never look past the sixth digit, so any number sharing the prefix
+    (with at least one more digit) maps to the same network.
+    """
+    return u.get_credit_card_network(bin_prefix + '0')
+
+
+class FeatureService:
+    """
+    Computes the full feature vector of a single transaction from a plain dict.
+
+    All DataFrame work (regex network detection, MII mapping, age binning and target
+    encoding) is done once in from_frame() and stored as dict / list lookup tables,
+    so transform() is pure Python and runs in microseconds.
+
+    Parameters:
+    - bin_networks: dict, BIN prefix -> credit card network
+    - te_maps: dict, column -> {category (str): encoded value}
+    - te_priors: dict, column -> value used for unseen categories
+    - age_bins: list of float, bin edges for the 'age_group' feature
+    - age_labels: list of str, labels for the 'age_group' bins
+    - today: date used to compute 'age' (defaults to date.today())
+    """
+
+    def __init__(self, bin_networks, te_maps, te_priors, age_bins, age_labels, today=None):
+        self.bin_networks = dict(bin_networks)
+        self.te_maps = te_maps
+        self.te_priors = te_priors
+        self.age_bins = list(age_bins)
+        self.age_labels = list(age_labels)
+        self.today = today or date.today()
+        self.feature_names = NUMERIC_FEATURES + [f'{col}_te' for col in te_maps]
+        # caches filled on demand (dob strings repeat per customer)
+        self._age_cache = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, train_df, target_col='is_fraud', te_cols=None, smoothing=100,
+                   age_qcut=5, age_label_txt='Age Group', today=None):
+        """
+        Builds the lookup tables from a processed training DataFrame (df_train_processed.pkl).
+
+        Parameters:
+        - train_df: pandas DataFrame with the engineered columns of Fraud.ipynb
+        - target_col: str, name of the target column
+        - te_cols: list of str, columns to target encode (defaults to TE_COLS)
+        - smoothing: float, smoothing factor of the TargetEncoder
+        - age_qcut: int, number of quantile bins for 'age_group'
+        - age_label_txt: str, label prefix for 'age_group'
+        - today: date used to compute 'age'
+        """
+        te_cols = TE_COLS if te_cols is None else te_cols
+
+        # BIN prefix -> network for every card seen in training
+        bins = train_df['cc_num'].astype(str).map(_clean_card_number).str[:BIN_LENGTH].unique()
+        bin_networks = {b: _bin_network(b) for b in bins}
+
+        # same quantile bins as statistical_testing.discretization
+        _, age_bins = pd.qcut(train_df['age'].dropna(), q=age_qcut, retbins=True, precision=0)
+        age_labels = [f'{age_label_txt}({int(age_bins[i])}-{int(age_bins[i+1])})' for i in range(len(age_bins)-1)]
+
+        # category -> encoding, fitted on the full training data (as for the test set)
+        te_maps, te_priors = {}, {}
+        y = train_df[target_col]
+        for col in te_cols:
+            encoder = TargetEncoder(cols=[col], smoothing=smoothing)
+            encoder.fit(train_df[[col]], y)
+            categories = pd.DataFrame({col: train_df[col].unique()})
+            encoded = encoder.transform(categories).values.ravel()
+            te_maps[col] = dict(zip(categories[col].astype(str), encoded.astype(float).tolist()))
+            te_priors[col] = float(y.mean())
+
+        return cls(bin_networks, te_maps, te_priors, age_bins, age_labels, today=today)
+
+    def _network(self, card_number):
+        bin_prefix = card_number[:BIN_LENGTH]
+        network = self.bin_networks.get(bin_prefix)
+        if network is None:
+            network = _bin_network(bin_prefix) if len(card_number) > BIN_LENGTH else u.get_credit_card_network(card_number)
+            with self._lock:
+                self.bin_networks[bin_prefix] = network
+        return network
+
+    def _age(self, dob):
+        age = self._age_cache.get(dob)
+        if age is None:
+            x = datetime.fromisoformat(str(dob)[:10])
+            today = self.today
+            age = today.year - x.year - ((today.month, today.day) < (x.month, x.day))
+            self._age_cache[dob] = age
+        return age
+
+    def _age_group(self, age):
+        # pd.cut(..., include_lowest=True): right-closed bins, first bin closed on both sides
+        bins = self.age_bins
+        if age is None or age < bins[0] or age > bins[-1]:
+            return 'Unknown'
+        return self.age_labels[max(bisect_left(bins, age) - 1, 0)]
+
+    def _base_features(self, txn):
+        """
+        Computes every feature except store_distance and the cyclical transforms,
+        which are vectorized in transform_batch().
+        """
+        ts = txn['trans_date_trans_time']
+        if not isinstance(ts, datetime):
+            ts = datetime.fromisoformat(str(ts))
+        card_number = _clean_card_number(txn['cc_num'])
+        merchant = str(txn['merchant'])
+        if merchant.startswith('fraud_'):
+            merchant = merchant[len('fraud_'):]
+        age = self._age(txn['dob'])
+        day_of_week = ts.weekday()
+
+        features = {
+            'amt': float(txn['amt']),
+            'amt_log': math.log1p(float(txn['amt'])),
+            'city_pop_log': math.log1p(float(txn['city_pop'])),
+            'age': age,
+            'trans_qtr': (ts.month - 1) // 3 + 1,
+            'trans_month': ts.month,
+            'trans_day': ts.day,
+            'trans_day_of_week': day_of_week,
+            'trans_hour': ts.hour,
+            'trans_week_of_year': ts.isocalendar()[1],
+            'is_weekend': day_of_week >= 5,
+            'industry': MII_TO_INDUSTRY.get(card_number[:1], 'Unknown'),
+            'cc_network': self._network(card_number),
+            'age_group': self._age_group(age),
+            'cc_num': card_number,
+            'merchant': merchant,
+        }
+        for col in ('category', 'gender', 'city', 'state', 'zip', 'job'):
+            if col in txn:
+                features[col] = str(txn[col])
+
+        for col, mapping in self.te_maps.items():
+            features[f'{col}_te'] = mapping.get(features.get(col), self.te_priors[col])
+        return features
+
+    def transform(self, txn):
+        """
+        Computes the features of a single transaction.
+
+        Parameters:
+        - txn: dict with the raw fraudTrain.csv columns of one transaction
+
+        Returns:
+        - dict, feature name -> value
+        """
+        features = self._base_features(txn)
+        features['store_distance'] = float(u.haversine_distance_calc(
+            float(txn['lat']), float(txn['long']), float(txn['merch_lat']), float(txn['merch_long'])))
+        for col, period in (('trans_hour', 24), ('trans_month', 12), ('trans_day_of_week', 7)):
+            angle = 2 * math.pi * features[col] / period
+            features[f'{col}_sin'] = math.sin(angle)
+            features[f'{col}_cos'] = math.cos(angle)
+        return features
+
+    def transform_batch(self, txns):
+        """
+        Computes the features of several transactions, vectorizing the distance and
+        cyclical transforms with NumPy.
+
+        Parameters:
+        - txns: list of dict, raw transactions
+
+        Returns:
+        - list of dict, one feature dict per transaction
+        """
+        if not txns:
+            return []
+        rows = [self._base_features(txn) for txn in txns]
+        coords = np.array([[txn['lat'], txn['long'], txn['merch_lat'], txn['merch_long']] for txn in txns], dtype=float)
+        distances = u.haversine_distance_calc(coords[:, 0], coords[:, 1], coords[:, 2], coords[:, 3])
+        cyclical = {}
+        for col, period in (('trans_hour', 24), ('trans_month', 12), ('trans_day_of_week', 7)):
+            angle = 2 * np.pi * np.array([row[col] for row in rows], dtype=float) / period
+            cyclical[f'{col}_sin'] = np.sin(angle)
+            cyclical[f'{col}_cos'] = np.cos(angle)
+
+        for i, row in enumerate(rows):
+            row['store_distance'] = float(distances[i])
+            for name, values in cyclical.items():
+                row[name] = float(values[i])
+        return rows
+
+    def vector(self, features):
+        """
+        Returns the numeric feature vector (ordered as self.feature_names) of a feature dict.
+        """
+        return [float(features[name]) for name in self.feature_names]
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests into small batches processed by one worker thread.
+    transform_batch() only vectorizes the distance and cyclical features, so the queue
+    hop usually costs more than batching saves; calling FeatureService.transform()
+    directly is faster unless many requests arrive at once (see README).
+
+    Batching is opportunistic: the worker takes every request already queued (up to
+    max_batch_size) and processes them at once, so a lone request is never held back.
+    With max_wait_ms > 0 the worker also waits up to that long for a batch to fill,
+    trading latency for throughput under heavy load.
+
+    Parameters:
+    - service: FeatureService
+    - max_batch_size: int, largest batch passed to transform_batch()
+    - max_wait_ms: float, longest time a request waits for the batch to fill (0: no wait)
+    """
+
+    def __init__(self, service, max_batch_size=64, max_wait_ms=0.0):
+        self.service = service
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._close_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name='feature-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, txn):
+        """
+        Queues a transaction and returns a Future resolving to its feature dict.
+        """
+        future = Future()
+        with self._close_lock:
+            if self._stopped.is_set():
+                raise RuntimeError('MicroBatcher is closed')
+            self._queue.put((txn, future))
+        return future
+
+    def transform(self, txn, timeout=None):
+        """
+        Blocking helper: submits a transaction and waits for its features.
+        """
+        return self.submit(txn).result(timeout)
+
+    def close(self):
+        """
+        Stops the worker and fails the requests still queued, so no caller waits forever.
+        """
+        with self._close_lock:
+            self._stopped.set()
+        self._worker.join()
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError('MicroBatcher is closed'))
+
+    def _get(self, timeout=None):
+        """
+        Next queued request whose future was not cancelled by its caller.
+        Raises queue.Empty like Queue.get() (timeout=0: do not wait).
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            if deadline is None:
+                item = self._queue.get()
+            else:
+                remaining = deadline - time.perf_counter()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            # marks the future as running, so a later cancel() cannot change its state
+            if item[1].set_running_or_notify_cancel():
+                return item
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                batch = [self._get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                # with max_wait_ms=0 this only drains what is already queued
+                remaining = max(0.0, deadline - time.perf_counter())
+                try:
+                    batch.append(self._get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._process(batch)
+            except Exception as exc:
+                # never let one batch end the worker; fail whatever is still unresolved
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _process(self, batch):
+        try:
+            results = self.service.transform_batch([txn for txn, _ in batch])
+        except Exception:
+            # fall back to one by one so a single bad transaction only fails its own request
+            for txn, future in batch:
+                try:
+                    future.set_result(self.service.transform(txn))
+                except Exception as exc:
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+
+class _FeatureHandler(BaseHTTPRequestHandler):
+    """
+    POST /features with a JSON transaction (or list of transactions) returns its features.
+    Requests go straight to the service on the server's request thread, or through the
+    batcher when one is set.
+    """
+    service = None
+    batcher = None
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/features':
+            self.send_error(404)
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length))
+            if self.batcher is None:
+                body = self.service.transform_batch(payload) if isinstance(payload, list) \
+                    else self.service.transform(payload)
+            elif isinstance(payload, list):
+                futures = [self.batcher.submit(txn) for txn in payload]
+                body = [future.result() for future in futures]
+            else:
+                body = self.batcher.transform(payload)
+        except (ValueError, KeyError, TypeError) as exc:
+            self.send_error(400, str(exc))
+            return
+        except Exception as exc:
+            self.send_error(500, str(exc))
+            return
+        data = json.dumps(body, default=_json_default).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # keep the console quiet under load
+        pass
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def make_server(service, host='127.0.0.1', port=8080, max_batch_size=64, max_wait_ms=0.0, batch=False):
+    """
+    Creates a local HTTP front end for a FeatureService.
+
+    Parameters:
+    - service: FeatureService
+    - host: str, interface to bind
+    - port: int, port to bind
+    - max_batch_size, max_wait_ms: micro-batching settings (see MicroBatcher)
+    - batch: bool, route requests through a MicroBatcher (opt-in, see README for when it helps)
+
+    Returns:
+    - (server, batcher); call server.serve_forever() to start and, if batcher is not None,
+      batcher.close() on shutdown
+    """
+    batcher = MicroBatcher(service, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms) if batch else None
+    handler = type('FeatureHandler', (_FeatureHandler,), {'service': service, 'batcher': batcher})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server, batcher
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve transaction features over HTTP.')
+    parser.add_argument('--train', default='../Data/df_train_processed.pkl', help='processed training pickle')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=0.0)
+    parser.add_argument('--batch', action='store_true', help='micro-batch concurrent requests')
+    args = parser.parse_args()
+
+    service = FeatureService.from_frame(pd.read_pickle(args.train))
+    server, batcher = make_server(service, args.host, args.port, args.max_batch_size, args.max_wait_ms, args.batch)
+    print(f"Serving features on http://{args.host}:{args.port}/features")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if batcher is not None:
+            batcher.close()
@@ -0,0 +1,110 @@
+# Load test for the feature service: reports p50/p99 latency and throughput.
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from feature_service import FeatureService, MicroBatcher
+
+
+def load_transactions(csv_path, n_rows, seed):
+    """
+    Samples raw transactions from fraudTrain.csv / fraudTest.csv as plain dicts.
+    """
+    df = pd.read_csv(csv_path, nrows=max(n_rows * 10, 10000))
+    df = df.sample(n=min(n_rows, len(df)), random_state=seed)
+    return json.loads(df.to_json(orient='records'))
+
+
+def run_load_test(call, transactions, concurrency=8, requests_per_worker=1000):
+    """
+    Calls `call(txn)` from several threads and records the latency of every call.
+
+    Parameters:
+    - call: function taking a transaction dict
+    - transactions: list of dict, transactions cycled through by each worker
+    - concurrency: int, number of concurrent client threads
+    - requests_per_worker: int, number of calls per thread
+
+    Returns:
+    - dict with p50/p90/p99/max latency (microseconds) and throughput (requests/second)
+    """
+    latencies = [[] for _ in range(concurrency)]
+
+    def worker(k):
+        n = len(transactions)
+        for i in range(requests_per_worker):
+            txn = transactions[(k * requests_per_worker + i) % n]
+            start = time.perf_counter()
+            call(txn)
+            latencies[k].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = np.concatenate([np.array(x) for x in latencies]) * 1e6
+    return {
+        'requests': len(all_latencies),
+        'p50_us': float(np.percentile(all_latencies, 50)),
+        'p90_us': float(np.percentile(all_latencies, 90)),
+        'p99_us': float(np.percentile(all_latencies, 99)),
+        'max_us': float(all_latencies.max()),
+        'throughput_rps': len(all_latencies) / elapsed,
+    }
+
+
+def http_call(url):
+    """
+    Returns a function posting a transaction to a running feature server.
+    """
+    def call(txn):
+        request = urllib.request.Request(url, data=json.dumps(txn).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            return response.read()
+    return call
+
+
+def print_results(label, results):
+    print(f"--- {label} ---")
+    print(f"Requests   = {results['requests']:,}")
+    print(f"p50        = {results['p50_us']:.1f} us")
+    print(f"p90        = {results['p90_us']:.1f} us")
+    print(f"p99        = {results['p99_us']:.1f} us")
+    print(f"max        = {results['max_us']:.1f} us")
+    print(f"Throughput = {results['throughput_rps']:,.0f} req/s\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure feature service latency.')
+    parser.add_argument('--train', default='../Data/df_train_processed.pkl', help='processed training pickle')
+    parser.add_argument('--csv', default='../Data/fraudTest.csv', help='raw transactions to replay')
+    parser.add_argument('--url', default=None, help='feature server URL; in-process if omitted')
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=1000, help='requests per worker')
+    parser.add_argument('--seed', type=int, default=1776)
+    args = parser.parse_args()
+
+    transactions = load_transactions(args.csv, args.rows, args.seed)
+
+    if args.url:
+        print_results(f'HTTP {args.url}', run_load_test(http_call(args.url), transactions,
+                                                         args.concurrency, args.requests))
+    else:
+        service = FeatureService.from_frame(pd.read_pickle(args.train))
+        print_results('In-process transform()', run_load_test(service.transform, transactions,
+                                                              args.concurrency, args.requests))
+        batcher = MicroBatcher(service)
+        print_results('Micro-batched', run_load_test(batcher.transform, transactions,
+                                                     args.concurrency, args.requests))
+        batcher.close()
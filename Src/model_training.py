@@ -0,0 +1,224 @@
+# Cross-validated training harness for the XGBoost / LightGBM fraud models.
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.metrics import average_precision_score, precision_recall_curve
+from sklearn.model_selection import StratifiedKFold, TimeSeriesSplit
+
+import lightgbm as lgb
+import xgboost as xgb
+
+
+# Engineered features from Fraud.ipynb used when no feature list is given
+DEFAULT_FEATURES = [
+    'amt_log', 'city_pop_log', 'age', 'store_distance', 'is_weekend',
+    'trans_hour_sin', 'trans_hour_cos', 'trans_month_sin', 'trans_month_cos',
+    'trans_day_of_week_sin', 'trans_day_of_week_cos',
+    'cc_num_te', 'industry_te', 'cc_network_te', 'age_group_te', 'job_te',
+    'state_te', 'city_te', 'merchant_te', 'category_te', 'zip_te',
+]
+
+# LightGBM parameters fixed when the Dataset is binned (see build_datasets(dataset_params=...))
+LGB_DATASET_PARAMS = {
+    'max_bin', 'max_bins', 'max_bin_by_feature', 'min_data_in_bin', 'bin_construct_sample_cnt',
+    'subsample_for_bin', 'data_random_seed', 'feature_pre_filter', 'use_missing', 'zero_as_missing',
+    'categorical_feature', 'cat_feature', 'categorical_column', 'cat_column', 'categorical_features',
+    'forcedbins_filename', 'enable_bundle', 'is_enable_bundle', 'bundle', 'linear_tree', 'linear_trees',
+}
+
+
+def _frame_key(data, feature_cols, target_col, weight_col=None, dataset_params=None):
+    """
+    Hash of the model inputs (feature / target / weight values, column names and
+    LightGBM Dataset parameters) used as cache key.
+    """
+    cols = list(feature_cols) + [target_col] + ([weight_col] if weight_col else [])
+    h = hashlib.sha1()
+    h.update(repr((list(feature_cols), target_col, weight_col, sorted((dataset_params or {}).items()))).encode())
+    h.update(pd.util.hash_pandas_object(data[cols], index=False).values.tobytes())
+    return h.hexdigest()[:16]
+
+
+def build_datasets(data, target_col='is_fraud', feature_cols=None, cache_dir='../Data/cache', weight_col=None,
+                   dataset_params=None):
+    """
+    Converts a DataFrame once into native binary datasets for LightGBM and XGBoost.
+    Files are keyed on a hash of the model inputs, so repeated runs on the same frame
+    load the binaries directly instead of converting the DataFrame again.
+
+    Parameters:
+    - data: pandas DataFrame, processed training data
+    - target_col: str, name of the target column
+    - feature_cols: list of str, numeric model inputs (defaults to DEFAULT_FEATURES)
+    - cache_dir: str, directory of the binary files
+    - weight_col: str, optional sample weight column (e.g. from sampling.negative_downsample),
+                  stored in both datasets and used by the CV metrics
+    - dataset_params: dict, LightGBM Dataset parameters (max_bin, min_data_in_bin, ...).
+                      The bins are fixed in the binary file, so they are part of the cache key
+                      and cannot be changed per cross_validate() call.
+
+    Returns:
+    - dict with the LightGBM Dataset ('lgb'), XGBoost DMatrix ('xgb'), the feature matrix ('X'),
+      the labels ('y'), the sample weights ('w', None if unweighted), the feature names ('features') and the conversion time in seconds ('convert_time')
+    """
+    feature_cols = DEFAULT_FEATURES if feature_cols is None else list(feature_cols)
+    # feature_pre_filter=False so min_data_in_leaf can still be tuned in cross_validate()
+    lgb_params = {'verbose': -1, 'feature_pre_filter': False, **(dataset_params or {})}
+    os.makedirs(cache_dir, exist_ok=True)
+    key = _frame_key(data, feature_cols, target_col, weight_col, lgb_params)
+    lgb_path = os.path.join(cache_dir, f'{key}.lgb.bin')
+    xgb_path = os.path.join(cache_dir, f'{key}.dmatrix')
+    X_path = os.path.join(cache_dir, f'{key}.X.npy')
+
+    start = time.perf_counter()
+    if not all(os.path.exists(path) for path in (lgb_path, xgb_path, X_path)):
+        X = data[feature_cols].to_numpy(dtype=np.float32)
+        y = data[target_col].astype(int).values
+        w = data[weight_col].astype(float).values if weight_col else None
+
+        lgb.Dataset(X, label=y, weight=w, feature_name=feature_cols, params=lgb_params).save_binary(lgb_path)
+        xgb.DMatrix(X, label=y, weight=w, feature_names=feature_cols).save_binary(xgb_path)
+        # raw matrix for LightGBM predictions (a binary Dataset keeps only the binned values)
+        np.save(X_path, X)
+
+    lgb_data = lgb.Dataset(lgb_path, params=lgb_params).construct()
+    xgb_data = xgb.DMatrix(xgb_path)
+    w = xgb_data.get_weight()
+
+    return {
+        'lgb': lgb_data,
+        'xgb': xgb_data,
+        'X': np.load(X_path, mmap_mode='r'),
+        'y': xgb_data.get_label().astype(int),
+        'w': w if len(w) else None,
+        'features': feature_cols,
+        'dataset_params': lgb_params,
+        'convert_time': time.perf_counter() - start,
+    }
+
+
+def make_folds(data, seed, target_col='is_fraud', method='time', time_col='trans_date_trans_time',
+               n_splits=5):
+    """
+    Builds cross-validation folds as row positions of `data`.
+
+    Parameters:
+    - data: pandas DataFrame
+    - seed: int, random seed for 'stratified' (use RANDOM_STATE, as in cross_validate())
+    - target_col: str, name of the target column (stratified folds)
+    - method: 'time' for expanding-window time-ordered folds (validation always after
+              training), 'stratified' for shuffled stratified K-Folds
+    - time_col: str, timestamp column used to order rows for 'time'
+    - n_splits: int, number of folds
+
+    Returns:
+    - list of (train_idx, val_idx) tuples of NumPy arrays
+    """
+    if method == 'time':
+        order = np.argsort(pd.to_datetime(data[time_col]).values, kind='stable')
+        splitter = TimeSeriesSplit(n_splits=n_splits)
+        return [(np.sort(order[train_idx]), np.sort(order[val_idx])) for train_idx, val_idx in splitter.split(order)]
+    elif method == 'stratified':
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+        return list(splitter.split(np.zeros(len(data)), data[target_col]))
+    else:
+        raise ValueError("Method must be 'time' or 'stratified'")
+
+
+def recall_at_precision(y_true, y_score, min_precision=0.9, sample_weight=None):
+    """
+    Highest recall reachable with precision of at least `min_precision`.
+    """
+    precision, recall, _ = precision_recall_curve(y_true, y_score, sample_weight=sample_weight)
+    mask = precision >= min_precision
+    return float(recall[mask].max()) if mask.any() else 0.0
+
+
+def _fit_fold(model, params, datasets, fold, train_idx, val_idx, num_boost_round,
+              early_stopping_rounds, min_precision, seed, n_threads):
+    """
+    Trains and evaluates one fold; runs in a worker thread (both libraries release the GIL).
+    """
+    y_val = datasets['y'][val_idx]
+    w_val = None if datasets.get('w') is None else datasets['w'][val_idx]
+    start = time.perf_counter()
+
+    if model == 'lightgbm':
+        fold_params = {'objective': 'binary', 'metric': 'average_precision', 'verbose': -1,
+                       'seed': seed, 'num_threads': n_threads, **params}
+        train_set = datasets['lgb'].subset(train_idx)
+        val_set = datasets['lgb'].subset(val_idx)
+        booster = lgb.train(fold_params, train_set, num_boost_round=num_boost_round,
+                            valid_sets=[val_set],
+                            callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)])
+        best_iteration = booster.best_iteration
+        fit_time = time.perf_counter() - start
+        y_score = booster.predict(datasets['X'][val_idx], num_iteration=best_iteration)
+    elif model == 'xgboost':
+        fold_params = {'objective': 'binary:logistic', 'eval_metric': 'aucpr',
+                       'seed': seed, 'nthread': n_threads, **params}
+        train_set = datasets['xgb'].slice(train_idx)
+        val_set = datasets['xgb'].slice(val_idx)
+        booster = xgb.train(fold_params, train_set, num_boost_round=num_boost_round,
+                            evals=[(val_set, 'val')], early_stopping_rounds=early_stopping_rounds,
+                            verbose_eval=False)
+        best_iteration = booster.best_iteration
+        fit_time = time.perf_counter() - start
+        y_score = booster.predict(val_set, iteration_range=(0, best_iteration + 1))
+    else:
+        raise ValueError("Model must be 'lightgbm' or 'xgboost'")
+
+    predict_time = time.perf_counter() - start - fit_time
+    return {
+        'fold': fold,
+        'n_train': len(train_idx),
+        'n_val': len(val_idx),
+        'pr_auc': average_precision_score(y_val, y_score, sample_weight=w_val),
+        f'recall@{min_precision:.2f}': recall_at_precision(y_val, y_score, min_precision, w_val),
+        'best_iteration': best_iteration,
+        'fit_time': fit_time,
+        'predict_time': predict_time,
+    }
+
+
+def cross_validate(datasets, folds, seed, model='lightgbm', params=None, num_boost_round=1000,
+                   early_stopping_rounds=50, min_precision=0.9, n_jobs=-1):
+    """
+    Runs the cross-validation folds in parallel with early stopping.
+
+    Parameters:
+    - datasets: dict returned by build_datasets()
+    - folds: list of (train_idx, val_idx) returned by make_folds()
+    - seed: int, random seed (use RANDOM_STATE, as in make_folds())
+    - model: 'lightgbm' or 'xgboost'
+    - params: dict, booster parameters (override the defaults). LightGBM Dataset parameters
+              (max_bin, ...) are rejected: pass them to build_datasets(dataset_params=...)
+    - num_boost_round: int, maximum number of boosting rounds
+    - early_stopping_rounds: int, rounds without PR-AUC improvement before stopping
+    - min_precision: float, precision level for the recall metric
+    - n_jobs: int, number of folds trained at the same time (-1 for all CPUs)
+
+    Returns:
+    - pandas DataFrame with per-fold metrics and timings
+    """
+    params = params or {}
+    if model == 'lightgbm':
+        binning = sorted(set(params) & LGB_DATASET_PARAMS)
+        if binning:
+            raise ValueError(f"{binning} are fixed when the binary Dataset is built; "
+                             "pass them to build_datasets(dataset_params=...) instead")
+    n_cpus = os.cpu_count() or 1
+    n_jobs = min(len(folds), n_cpus if n_jobs == -1 else n_jobs)
+    # split the CPUs between the folds trained concurrently
+    n_threads = max(1, n_cpus // n_jobs)
+
+    results = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(_fit_fold)(model, params, datasets, fold, train_idx, val_idx, num_boost_round,
+                           early_stopping_rounds, min_precision, seed, n_threads)
+        for fold, (train_idx, val_idx) in enumerate(folds)
+    )
+    return pd.DataFrame(results).set_index('fold')
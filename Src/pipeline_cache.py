@@ -0,0 +1,252 @@
+# Content-addressed on-disk cache of pipeline stage outputs (Parquet, size-based LRU eviction).
+import datetime
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _names(code):
+    """
+    Global names used by a code object, including nested lambdas and comprehensions.
+    """
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _names(const)
+    return names
+
+
+def _source(func, seen=None):
+    """
+    Source of a function plus the sources of the functions / classes it calls that are
+    defined next to it (same directory, i.e. the Src modules), whether called directly
+    (weighted_quantiles) or through a module alias (u.get_credit_card_network).
+    Editing such a helper then invalidates the stage too; third-party code is not followed.
+    """
+    seen = set() if seen is None else seen
+    seen.add(func)
+    try:
+        source = inspect.getsource(func).encode()
+        src_dir = os.path.dirname(os.path.abspath(inspect.getsourcefile(func)))
+    except (OSError, TypeError):
+        return getattr(getattr(func, '__code__', None), 'co_code', b'')
+
+    def is_local(obj):
+        try:
+            return os.path.dirname(os.path.abspath(inspect.getsourcefile(obj))) == src_dir
+        except TypeError:
+            return False
+
+    code = getattr(func, '__code__', None)
+    names = sorted(_names(code)) if code else []
+    module_globals = getattr(func, '__globals__', {})
+    helpers = []
+    for name in names:
+        obj = module_globals.get(name)
+        if inspect.ismodule(obj) and is_local(obj):
+            helpers += [getattr(obj, attr) for attr in names if hasattr(obj, attr)]
+        elif obj is not None:
+            helpers.append(obj)
+    for helper in helpers:
+        if (inspect.isfunction(helper) or inspect.isclass(helper)) and helper not in seen and is_local(helper):
+            source += _source(helper, seen)
+    return source
+
+
+def _hash_value(h, value, input_cols=None):
+    """
+    Feeds an argument into the hash `h`: pandas / NumPy objects by their values, containers
+    element by element, functions by their source and scalars by their repr. Raises TypeError
+    for anything else, since its repr may not reflect its contents (or may include its id).
+    """
+    if isinstance(value, pd.DataFrame):
+        cols = list(value.columns) if input_cols is None else [c for c in input_cols if c in value.columns]
+        h.update(b'DataFrame' + repr(cols).encode())
+        h.update(pd.util.hash_pandas_object(value[cols], index=True).values.tobytes())
+    elif isinstance(value, pd.Series):
+        h.update(b'Series' + repr((value.name, str(value.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, pd.Index):
+        h.update(b'Index' + repr((value.name, str(value.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(value).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(b'ndarray' + repr((value.dtype.str, value.shape)).encode())
+        if value.dtype == object:
+            # tobytes() of an object array is the pointers, not the values
+            h.update(pd.util.hash_pandas_object(pd.Series(value.ravel()), index=False).values.tobytes())
+        else:
+            h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = sorted(value, key=repr) if isinstance(value, (set, frozenset)) else value
+        h.update(f'{type(value).__name__}{len(items)}'.encode())
+        for item in items:
+            _hash_value(h, item, input_cols)
+    elif isinstance(value, dict):
+        h.update(f'dict{len(value)}'.encode())
+        for k in sorted(value, key=repr):
+            _hash_value(h, k)
+            _hash_value(h, value[k], input_cols)
+    elif inspect.isfunction(value):
+        h.update(b'function' + value.__qualname__.encode() + _source(value))
+    elif value is None or isinstance(value, (bool, int, float, complex, str, bytes, np.generic,
+                                             datetime.date, datetime.timedelta, pd.Timestamp, pd.Timedelta)):
+        h.update(f'{type(value).__name__}:{value!r}'.encode())
+    else:
+        raise TypeError(f"StageCache cannot hash an argument of type {type(value).__name__}")
+
+
+class StageCache:
+    """
+    Memoizes DataFrame transforms on disk.
+
+    A stage is keyed on the function source and a hash of every argument, positional or
+    keyword: DataFrames on their input columns, Series / arrays on their values, and
+    scalars (seed, smoothing, n_splits, ...) on their repr. Arguments of any other type
+    raise TypeError instead of being keyed on a repr that may not reflect them. Because each stage hashes its
+    actual inputs, changing one stage only recomputes that stage and the stages whose
+    inputs it changes; everything else is loaded from the cache.
+
+    Only the columns a stage adds (or the ones listed in `output_cols`) are stored, as
+    Parquet files; on a hit they are assigned back onto the input frame. When the cache
+    grows past `max_bytes`, the least recently used entries are removed.
+
+    Parameters:
+    - cache_dir: str, directory of the cache
+    - max_bytes: int, size limit of the cache directory
+    - verbose: bool, if True, prints hits, misses and evictions
+    """
+
+    def __init__(self, cache_dir='../Data/cache/stages', max_bytes=10 * 2**30, verbose=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.verbose = verbose
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def run(self, func, *args, input_cols=None, output_cols=None, **kwargs):
+        """
+        Runs `func(*args, **kwargs)` or loads its output from the cache.
+
+        Parameters:
+        - func: function taking one or more DataFrames (positional) and returning a
+                DataFrame or a tuple of DataFrames (one per DataFrame argument, same order)
+        - input_cols: list of str, columns the stage reads from each DataFrame argument
+                      (positional or keyword); defaults to all columns. Columns missing
+                      from a frame are ignored (e.g. the target in a test frame).
+        - output_cols: list of str, columns the stage writes; defaults to the new columns.
+                       Required for stages that modify existing columns in place.
+
+        Returns:
+        - the output of func
+        """
+        frames = [arg for arg in args if isinstance(arg, pd.DataFrame)]
+        key = self._key(func, args, kwargs, input_cols)
+        entry = os.path.join(self.cache_dir, key)
+
+        if os.path.exists(os.path.join(entry, 'meta.json')):
+            with open(os.path.join(entry, 'meta.json')) as f:
+                meta = json.load(f)
+            # update access time for LRU eviction
+            os.utime(os.path.join(entry, 'meta.json'))
+            outputs = []
+            for i, frame in enumerate(frames):
+                # the caller's frame (with any columns it gained since) plus the stored outputs
+                stored = pd.read_parquet(os.path.join(entry, f'{i}.parquet'))
+                result = frame.copy()
+                for col in stored.columns:
+                    result[col] = stored[col].values
+                outputs.append(result)
+            if self.verbose:
+                print(f"[cache] hit  {func.__name__} ({key})")
+            return tuple(outputs) if meta['is_tuple'] else outputs[0]
+
+        # copies so in-place stages do not change the frames used to build the key
+        call_args = [arg.copy() if isinstance(arg, pd.DataFrame) else arg for arg in args]
+        call_kwargs = {k: v.copy() if isinstance(v, pd.DataFrame) else v for k, v in kwargs.items()}
+        start = time.perf_counter()
+        output = func(*call_args, **call_kwargs)
+        elapsed = time.perf_counter() - start
+        is_tuple = isinstance(output, tuple)
+        outputs = list(output) if is_tuple else [output]
+
+        tmp = entry + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for i, (frame, result) in enumerate(zip(frames, outputs)):
+            cols = output_cols if output_cols is not None else [c for c in result.columns if c not in frame.columns]
+            result[[c for c in cols if c in result.columns]].to_parquet(os.path.join(tmp, f'{i}.parquet'))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({'func': func.__name__, 'is_tuple': is_tuple}, f)
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(tmp, entry)
+
+        if self.verbose:
+            print(f"[cache] miss {func.__name__} ({key}) computed in {elapsed:.2f}s")
+        self._evict()
+        return output
+
+    def read_csv(self, path, **kwargs):
+        """
+        pd.read_csv() cached as Parquet, keyed on the file path, size and modification time.
+        """
+        stat = os.stat(path)
+        h = hashlib.sha1(repr((os.path.abspath(path), stat.st_size, stat.st_mtime_ns, sorted(kwargs.items()))).encode())
+        entry = os.path.join(self.cache_dir, 'csv_' + h.hexdigest()[:16])
+        file_path = os.path.join(entry, '0.parquet')
+
+        if os.path.exists(file_path):
+            os.utime(file_path)
+            if self.verbose:
+                print(f"[cache] hit  read_csv {os.path.basename(path)}")
+            return pd.read_parquet(file_path)
+
+        data = pd.read_csv(path, **kwargs)
+        os.makedirs(entry, exist_ok=True)
+        data.to_parquet(file_path)
+        if self.verbose:
+            print(f"[cache] miss read_csv {os.path.basename(path)}")
+        self._evict()
+        return data
+
+    def clear(self):
+        """
+        Removes every cache entry.
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _key(self, func, args, kwargs, input_cols):
+        h = hashlib.sha1()
+        h.update(func.__module__.encode() + b'.' + func.__qualname__.encode())
+        h.update(_source(func))
+        _hash_value(h, tuple(args), input_cols)
+        _hash_value(h, kwargs, input_cols)
+        _hash_value(h, input_cols)
+        return h.hexdigest()[:16]
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path) or name.endswith('.tmp'):
+                continue
+            files = [os.path.join(path, f) for f in os.listdir(path)]
+            size = sum(os.path.getsize(f) for f in files)
+            last_used = max((os.path.getmtime(f) for f in files), default=0)
+            entries.append((last_used, size, path))
+            total += size
+
+        # remove the least recently used entries first
+        for last_used, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            if self.verbose:
+                print(f"[cache] evicted {os.path.basename(path)} ({size / 2**20:.1f} MB)")
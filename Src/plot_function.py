@@ -75,7 +75,7 @@ def plot_violin_by_binary_category(data, binary_col, numeric_col, title = None,
 
 
 
-def plot_distribution(data, x_col, hue_col, save_path= None, dpi=600, log_scale=True, bins=50):
+def plot_distribution(data, x_col, hue_col, save_path= None, dpi=600, log_scale=True, bins=50, weight_col=None):
     """
     Generates side-by-side plots (histogram and KDE) showing the distribution of
     transaction amounts by fraud status on a log scale.
@@ -85,6 +85,8 @@ def plot_distribution(data, x_col, hue_col, save_path= None, dpi=600, log_scale=
         x_col (str): The name of the column containing transaction amounts.
         hue_col (str): The name of the column indicating fraud status (e.g., 'isFraud').
         bins (int, optional): The number of bins for the histogram. Defaults to 50.
+        weight_col (str, optional): Sample weight column (e.g. from sampling.negative_downsample).
+                                    Defaults to None (unweighted).
     """
     # filter out non-positive values for log scale
     subset = data[data[x_col] > 0].copy() # .copy() to avoid SettingWithCopyWarning
@@ -102,6 +104,7 @@ def plot_distribution(data, x_col, hue_col, save_path= None, dpi=600, log_scale=
         element='bars',
         common_norm=False,
         log_scale=log_scale,
+        weights=weight_col,
         ax=axes[0]
     )
     axes[0].set_title(f'Histogram of {x_col} by {hue_col} Status')
@@ -121,6 +124,7 @@ def plot_distribution(data, x_col, hue_col, save_path= None, dpi=600, log_scale=
         common_norm=False,
         fill=True,
         linewidth=2,
+        weights=weight_col,
         ax=axes[1]
     )
     axes[1].set_title(f'KDE of {x_col} by {hue_col} Status')
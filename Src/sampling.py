@@ -0,0 +1,91 @@
+# Negative downsampling with inverse-probability weights for faster iteration on the imbalanced data.
+import numpy as np
+import pandas as pd
+
+
+def negative_downsample(data, target_col, frac, seed, strata_cols=None, weight_col='sample_weight'):
+    """
+    Keeps every positive (fraud) row and a seeded, stratified fraction of the negative rows,
+    and attaches inverse-probability weights so weighted counts match the full data.
+
+    Parameters:
+    - data: pandas DataFrame
+    - target_col: str, name of the binary target column
+    - frac: float, fraction (0-1] of negative rows to keep
+    - seed: int, random seed for reproducibility
+    - strata_cols: list of str, columns the negatives are stratified on (e.g. ['category']);
+                   each stratum keeps the same fraction (at least one row). Defaults to no stratification.
+    - weight_col: str, name of the weight column to add
+
+    Returns:
+    - sample: pandas DataFrame, downsampled rows (original index kept) with the weight column.
+              Positives get weight 1, negatives get n_negatives / n_sampled of their stratum.
+    """
+    if not 0 < frac <= 1:
+        raise ValueError("frac must be in (0, 1]")
+
+    # positional masks, so duplicate index labels cannot select a row twice
+    is_positive = (data[target_col].astype(int) == 1).values
+    negative_pos = np.flatnonzero(~is_positive)
+    negatives = data.iloc[negative_pos].reset_index(drop=True)
+
+    if strata_cols:
+        strata = [negatives[col] for col in strata_cols]
+    else:
+        strata = [pd.Series(0, index=negatives.index)]
+
+    # random rank of every negative row within its stratum; each stratum keeps
+    # round(frac * size) rows, but at least one so no stratum vanishes from the sample
+    rng = np.random.default_rng(seed)
+    rank = pd.Series(rng.random(len(negatives))) \
+        .groupby(strata, observed=True, dropna=False).rank(method='first')
+    n_total = negatives.groupby(strata, observed=True, dropna=False)[target_col].transform('size')
+    n_kept = np.maximum(1, np.round(frac * n_total))
+
+    keep = is_positive.copy()
+    keep[negative_pos] = (rank <= n_kept).values
+    # exact inverse sampling probability per stratum (rounding makes it differ from 1 / frac)
+    weights = np.ones(len(data))
+    weights[negative_pos] = (n_total / n_kept).values
+
+    # boolean selection keeps the original row order (time order for the transaction data)
+    sample = data[keep].copy()
+    sample[weight_col] = weights[keep]
+    return sample
+
+
+def weighted_quantiles(values, quantiles, weights):
+    """
+    Quantiles of `values` under sample weights (inverse of the weighted empirical CDF).
+    """
+    values = np.asarray(values, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    order = np.argsort(values)
+    values, weights = values[order], weights[order]
+    cdf = (np.cumsum(weights) - 0.5 * weights) / weights.sum()
+    return np.interp(quantiles, cdf, values)
+
+
+def compare_rates(full_data, sample, col, target_col, weight_col='sample_weight'):
+    """
+    Compares the target rate per category of `col` on the full data against the
+    weighted estimate on the downsampled data.
+
+    Parameters:
+    - full_data: pandas DataFrame, all rows
+    - sample: pandas DataFrame returned by negative_downsample()
+    - col: str, categorical column to compare
+    - target_col: str, name of the binary target column
+    - weight_col: str, name of the weight column
+
+    Returns:
+    - pandas DataFrame with the full and weighted-sample rates and their absolute difference
+    """
+    full_rate = full_data.groupby(col, observed=True)[target_col].mean()
+    weighted = sample[target_col].astype(float) * sample[weight_col]
+    sample_rate = weighted.groupby(sample[col], observed=True).sum() / \
+        sample[weight_col].groupby(sample[col], observed=True).sum()
+
+    comparison = pd.DataFrame({'full_rate': full_rate, 'sample_rate': sample_rate})
+    comparison['abs_diff'] = (comparison['full_rate'] - comparison['sample_rate']).abs()
+    return comparison
@@ -4,9 +4,10 @@ from scipy.stats import chi2_contingency
 from sklearn.mixture import GaussianMixture
 import matplotlib.pyplot as plt
 from sklearn.preprocessing import MinMaxScaler
+from sampling import weighted_quantiles
 
 
-def chi_square_test(data, col1, col2, print_results=True):
+def chi_square_test(data, col1, col2, print_results=True, weight_col=None):
     """
     Performs a Chi-Square Test for Independence between two categorical variables.
     Null Hypothesis: There is no association between the two categorical variables.
@@ -16,11 +17,17 @@ def chi_square_test(data, col1, col2, print_results=True):
     - col1: str, name of the first categorical column
     - col2: str, name of the second categorical column
     - print_results: bool, if True, prints the test summary
+    - weight_col: str, optional sample weight column (e.g. from sampling.negative_downsample);
+                  the contingency table then holds weighted counts that estimate the full-data counts
     """
-    # Create contingency table (counts)
-    contingency_table = pd.crosstab(data[col1], data[col2])
+    if weight_col is None:
+        # Create contingency table (counts)
+        contingency_table = pd.crosstab(data[col1], data[col2])
+    else:
+        # Create contingency table (weighted counts)
+        contingency_table = pd.crosstab(data[col1], data[col2], values=data[weight_col], aggfunc='sum').fillna(0)
     # Normalize the contingency table to get percentages
-    contingency_table_norm = pd.crosstab(data[col1], data[col2], normalize='columns') * 100
+    contingency_table_norm = contingency_table / contingency_table.sum(axis=0) * 100
 
 
     # Rename columns for clarity
@@ -51,19 +58,25 @@ def chi_square_test(data, col1, col2, print_results=True):
 
 
 
-def gaussian_mixture_binning(data, colum_list, seed, n_init=10):
+def gaussian_mixture_binning(data, colum_list, seed, n_init=10, weight_col=None):
     """
     This function is designed to fit a Gaussian Mixture Model (GMM) with different numbers of 
     components (clusters) and use information criteria (AIC and BIC) to determine the optimal 
     number of components. It then visualizes the results using a plot to help identify the best 
     number of components for the GMM.
+    If weight_col is given, GaussianMixture has no sample weights, so the rows are resampled
+    (seeded, with replacement) in proportion to their weights before fitting.
     """
     # initialize fit GMM with different number of components and select the best using AIC or BIC
     aic = [] # AIC (Akaike Information Criterion)    Lower the Better
     bic = [] # BIC (Bayesian Information Criterion)  Lower the Better
     components_range = range(1, 11)  # 1 to 10 components
     # remove any NaNs
-    data = data[colum_list].dropna()
+    if weight_col is None:
+        data = data[colum_list].dropna()
+    else:
+        data = data[colum_list + [weight_col]].dropna()
+        data = data[colum_list].sample(n=len(data), replace=True, weights=data[weight_col], random_state=seed)
     
     for n in components_range:
         gmm = GaussianMixture(n_components=n, n_init=n_init, random_state=seed)
@@ -82,9 +95,15 @@ def gaussian_mixture_binning(data, colum_list, seed, n_init=10):
 
 
 
-def discretization(data, feature, newFeature, qcut, labelTxt):
+def discretization(data, feature, newFeature, qcut, labelTxt, weight_col=None):
     # use quartile bin
-    _, bins = pd.qcut(data[feature].dropna(), q=qcut, retbins=True, precision=0)
+    if weight_col is None:
+        _, bins = pd.qcut(data[feature].dropna(), q=qcut, retbins=True, precision=0)
+    else:
+        # weighted quantiles so the bins match the ones of the full data
+        valid = data[feature].notna()
+        bins = weighted_quantiles(data.loc[valid, feature], np.linspace(0, 1, qcut + 1), data.loc[valid, weight_col])
+        bins = np.unique(bins)
 
     # create custom labels
     labels = [f'{labelTxt}({int(bins[i])}-{int(bins[i+1])})' for i in range(len(bins)-1)]
@@ -1,9 +1,47 @@
 import numpy as np
 # import pandas as pd
+from scipy.special import expit
 from sklearn.model_selection import StratifiedKFold
 from category_encoders import TargetEncoder
 
 
+class WeightedTargetEncoder:
+    """
+    Single-column target encoder with sample weights, using the same smoothing as
+    category_encoders.TargetEncoder (sigmoid of the category count, unknowns get the prior).
+    Counts and means are weighted, so on a downsampled frame with inverse-probability
+    weights the encodings estimate the ones fitted on the full data.
+    """
+
+    def __init__(self, col, smoothing=100, min_samples_leaf=20):
+        self.col = col
+        self.smoothing = smoothing
+        self.min_samples_leaf = min_samples_leaf
+
+    def fit(self, X, y, sample_weight):
+        y = y.astype(float)
+        prior = np.average(y, weights=sample_weight)
+        # missing values are a category of their own, as in category_encoders
+        keys = X[self.col].values
+        weighted = (y * sample_weight).groupby(keys, observed=True, dropna=False).sum()
+        count = sample_weight.groupby(keys, observed=True, dropna=False).sum()
+        mean = weighted / count
+        smoove = expit((count - self.min_samples_leaf) / self.smoothing)
+        encoding = prior * (1 - smoove) + mean * smoove
+        is_nan = encoding.index.isna()
+        self.prior_ = prior
+        self.nan_value_ = float(encoding[is_nan].iloc[0]) if is_nan.any() else prior
+        self.mapping_ = encoding[~is_nan]
+        return self
+
+    def transform(self, X):
+        values = X[self.col]
+        encoded = values.astype(object).map(self.mapping_).astype(float)
+        # NaN seen in fit gets its own encoding, unknown categories get the prior
+        encoded[values.isna().values] = self.nan_value_
+        return encoded.fillna(self.prior_).values
+
+
 def leakage_free_target_encoding(
     train_df,
     test_df,
@@ -11,7 +49,8 @@ def leakage_free_target_encoding(
     cat_cols,
     seed,
     smoothing=100,
-    n_splits=5):
+    n_splits=5,
+    weight_col=None):
     """
     Leakage-free target encoding with K-Fold cross-validation and smoothing.
     
@@ -31,6 +70,9 @@ def leakage_free_target_encoding(
         Number of K-Folds.
     random_state : int
         Random seed for reproducibility.
+    weight_col : str, optional
+        Sample weight column of train_df (e.g. from sampling.negative_downsample).
+        If given, the encodings use weighted counts and means (WeightedTargetEncoder).
     
     Returns:
     --------
@@ -55,19 +97,28 @@ def leakage_free_target_encoding(
         for train_idx, val_idx in kf.split(train_encoded, train_df[target_col]):
             train_fold = train_df.iloc[train_idx]
             val_fold = train_df.iloc[val_idx]
-            val_index = train_df.index[val_idx]
 
             # Fit encoder on the training fold and transform the validation fold
-            encoder = TargetEncoder(cols=[col], smoothing=smoothing)
-            encoder.fit(train_fold[[col]], train_fold[target_col])
-            oof_encoded[val_index] = encoder.transform(val_fold[[col]]).values.ravel()
+            if weight_col is None:
+                encoder = TargetEncoder(cols=[col], smoothing=smoothing)
+                encoder.fit(train_fold[[col]], train_fold[target_col])
+                oof_encoded[val_idx] = encoder.transform(val_fold[[col]]).values.ravel()
+            else:
+                encoder = WeightedTargetEncoder(col, smoothing=smoothing)
+                encoder.fit(train_fold[[col]], train_fold[target_col], train_fold[weight_col])
+                oof_encoded[val_idx] = encoder.transform(val_fold[[col]])
         
         # Assign out-of-fold encodings to the training data
         train_encoded[f'{col}_te'] = oof_encoded
         
         # Fit encoder on full original training data
-        final_encoder = TargetEncoder(cols=[col], smoothing=smoothing)
-        final_encoder.fit(train_df[[col]], train_df[target_col])
-        test_encoded[f'{col}_te'] = final_encoder.transform(test_df[[col]]).values.ravel()
+        if weight_col is None:
+            final_encoder = TargetEncoder(cols=[col], smoothing=smoothing)
+            final_encoder.fit(train_df[[col]], train_df[target_col])
+            test_encoded[f'{col}_te'] = final_encoder.transform(test_df[[col]]).values.ravel()
+        else:
+            final_encoder = WeightedTargetEncoder(col, smoothing=smoothing)
+            final_encoder.fit(train_df[[col]], train_df[target_col], train_df[weight_col])
+            test_encoded[f'{col}_te'] = final_encoder.transform(test_df[[col]])
     
     return train_encoded, test_encoded
\ No newline at end of file
@@ -2,6 +2,7 @@
 from geopy.distance import geodesic
 import re
 import numpy as np
+import pandas as pd
 
 
 def haversine_distance_calc(lat1, lon1, lat2, lon2, units="mi"):
@@ -116,4 +117,74 @@ def get_credit_card_network(card_number):
         if re.match(pattern, clean_number): # Use clean_number here
             return network
     
-    return "Unknown"
\ No newline at end of file
+    return "Unknown"
+
+
+
+def add_calendar_features(data, today, time_col='trans_date_trans_time', dob_col='dob'):
+    """
+    Adds the calendar features of Fraud.ipynb: quarter, month, day, day of week, hour,
+    week of year, weekend flag, sine/cosine transforms and age (from the date of birth).
+
+    Args:
+        data (pd.DataFrame): Transactions with datetime `time_col` and `dob_col` columns.
+        today (pd.Timestamp): Reference date for the age calculation.
+
+    Returns:
+        pd.DataFrame: The DataFrame with the new columns.
+    """
+    ts = data[time_col].dt
+    data['trans_qtr'] = ts.quarter
+    data['trans_month'] = ts.month
+    data['trans_day'] = ts.day
+    data['trans_day_of_week'] = ts.dayofweek
+    data['trans_hour'] = ts.hour
+    data['trans_week_of_year'] = ts.isocalendar().week
+    data['is_weekend'] = data['trans_day_of_week'] >= 5  # Saturday, Sunday
+
+    # sine and cosine transformations to preserve the cyclical nature (23:00 is closer to 00:00 than to 12:00)
+    for col, period in (('trans_hour', 24), ('trans_month', 12), ('trans_day_of_week', 7)):
+        data[f'{col}_sin'] = np.sin(2 * np.pi * data[col].astype(int) / period)
+        data[f'{col}_cos'] = np.cos(2 * np.pi * data[col].astype(int) / period)
+
+    # age, accounting for whether the birthday has passed in the current year
+    dob = data[dob_col].dt
+    before_birthday = (dob.month > today.month) | ((dob.month == today.month) & (dob.day > today.day))
+    data['age'] = today.year - dob.year - before_birthday.astype(int)
+
+    return data
+
+
+
+def add_card_features(data, mapping_dict, card_col='cc_num'):
+    """
+    Adds the 'industry' (Major Industry Identifier) and 'cc_network' columns.
+    Both only depend on the card number, so they are computed once per distinct card.
+
+    Args:
+        data (pd.DataFrame): Transactions with a card number column.
+        mapping_dict (dict): First digit -> industry mapping.
+
+    Returns:
+        pd.DataFrame: The DataFrame with the new columns.
+    """
+    cards = pd.Series(data[card_col].unique())
+    industry = dict(zip(cards, cards.apply(lambda x: map_first_digit_to_value(x, mapping_dict=mapping_dict))))
+    network = dict(zip(cards, cards.apply(lambda x: get_credit_card_network(str(x)))))
+
+    data['industry'] = data[card_col].map(industry)
+    data['cc_network'] = data[card_col].map(network)
+
+    return data
+
+
+
+def add_store_distance(data, units="mi"):
+    """
+    Adds 'store_distance', the Haversine distance between the customer (lat, long)
+    and the merchant (merch_lat, merch_long), computed on whole columns.
+    """
+    data['store_distance'] = haversine_distance_calc(
+        data['lat'].values, data['long'].values, data['merch_lat'].values, data['merch_long'].values, units=units
+    )
+    return data